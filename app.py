@@ -3,6 +3,7 @@ import os
 from flask import Flask, render_template, request, flash, redirect, session, g
 from flask_debugtoolbar import DebugToolbarExtension
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
 from forms import UserAddForm, LoginForm, MessageForm, UserEditForm
 from models import db, connect_db, User, Message
@@ -35,12 +36,24 @@ connect_db(app)
 # User signup/login/logout
 
 
+# Pages that show a follow/unfollow button for every user they list. The
+# current user's follows are loaded along with them, so each of those
+# g.user.is_following() checks is answered in memory, not with a query
+
+FOLLOW_BUTTON_PAGES = {'list_users', 'show_following', 'users_followers'}
+
+
 @app.before_request
 def add_user_to_g():
     """If we're logged in, add curr user to Flask global."""
 
     if CURR_USER_KEY in session:
-        g.user = User.query.get(session[CURR_USER_KEY])
+        query = User.query
+
+        if request.endpoint in FOLLOW_BUTTON_PAGES:
+            query = query.options(selectinload(User.following))
+
+        g.user = query.get(session[CURR_USER_KEY])
 
     else:
         g.user = None
@@ -267,7 +280,13 @@ def show_likes(user_id):
         flash("Access unauthorized.", "danger")
         return redirect("/")
     
-    user = User.query.get_or_404(user_id)
+    # not get_or_404(): on our own page that returns g.user as already
+    # loaded and skips the query, options and all
+    user = (User
+            .query
+            .options(selectinload(User.likes).joinedload(Message.user))
+            .filter_by(id=user_id)
+            .first_or_404())
     return render_template("users/likes.html", user=user)
 
 ##############################################################################
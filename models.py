@@ -4,6 +4,7 @@ from datetime import datetime
 
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect
 
 bcrypt = Bcrypt()
 db = SQLAlchemy()
@@ -121,14 +122,31 @@ class User(db.Model):
     def is_followed_by(self, other_user):
         """Is this user followed by `other_user`?"""
 
-        found_user_list = [user for user in self.followers if user == other_user]
-        return len(found_user_list) == 1
+        # Reuse the collection if it's already loaded; otherwise ask
+        # the database directly rather than loading every follower
+
+        if 'followers' not in inspect(self).unloaded:
+            return other_user in self.followers
+
+        return db.session.query(
+            Follows.query.filter_by(
+                user_being_followed_id=self.id,
+                user_following_id=other_user.id,
+            ).exists()
+        ).scalar()
 
     def is_following(self, other_user):
         """Is this user following `other_use`?"""
 
-        found_user_list = [user for user in self.following if user == other_user]
-        return len(found_user_list) == 1
+        if 'following' not in inspect(self).unloaded:
+            return other_user in self.following
+
+        return db.session.query(
+            Follows.query.filter_by(
+                user_being_followed_id=other_user.id,
+                user_following_id=self.id,
+            ).exists()
+        ).scalar()
 
     @classmethod
     def signup(cls, username, email, password, image_url):
@@ -208,3 +226,4 @@ def connect_db(app):
 
     db.app = app
     db.init_app(app)
+    bcrypt.init_app(app)
@@ -5,45 +5,21 @@
 #    python -m unittest test_user_model.py
 
 
-import os
-from unittest import TestCase
 from datetime import datetime
 
-from models import db, User, Message, Follows
+from models import User, Message
+from tests.database import DatabaseTestCase, create_db_app, db
 
-# BEFORE we import our app, let's set an environmental variable
-# to use a different database for tests (we need to do this
-# before we import our app, since that will have already
-# connected to the database
+# Model tests only need the database, so rather than importing the
+# whole app (views, templates, forms), run them against a bare one
 
-os.environ['DATABASE_URL'] = "postgresql:///warbler-test"
+app = create_db_app()
+app.app_context().push()
 
 
-# Now we can import app
-
-from app import app
-
-# Create our tables (we do this here, so we only create the tables
-# once for all tests --- in each test, we'll delete the data
-# and create fresh new clean test data
-
-db.create_all()
-
-
-class MessageModelTestCase(TestCase):
+class MessageModelTestCase(DatabaseTestCase):
     """Test views for messages."""
 
-    def setUp(self):
-        """Create test client, add sample data."""
-
-        db.session.rollback()
-        User.query.delete()
-        Message.query.delete()
-        Follows.query.delete()
-
-        self.client = app.test_client()
-
-
     def test_message_model(self):
         """Does basic model work?"""
         u = User(
@@ -5,44 +5,21 @@
 #    python -m unittest test_user_model.py
 
 
-import os
-from unittest import TestCase
+from sqlalchemy import inspect
 
-from models import db, User, Message, Follows
+from models import User, Follows
+from tests.database import DatabaseTestCase, create_db_app, db
 
-# BEFORE we import our app, let's set an environmental variable
-# to use a different database for tests (we need to do this
-# before we import our app, since that will have already
-# connected to the database
+# Model tests only need the database, so rather than importing the
+# whole app (views, templates, forms), run them against a bare one
 
-os.environ['DATABASE_URL'] = "postgresql:///warbler-test"
+app = create_db_app()
+app.app_context().push()
 
 
-# Now we can import app
-
-from app import app
-
-# Create our tables (we do this here, so we only create the tables
-# once for all tests --- in each test, we'll delete the data
-# and create fresh new clean test data
-
-db.create_all()
-
-
-class UserModelTestCase(TestCase):
+class UserModelTestCase(DatabaseTestCase):
     """Test views for messages."""
 
-    def setUp(self):
-        """Create test client, add sample data."""
-
-        db.session.rollback()
-        User.query.delete()
-        Message.query.delete()
-        Follows.query.delete()
-
-        self.client = app.test_client()
-
-
     def test_user_model(self):
         """Does basic model work?"""
 
@@ -80,53 +57,71 @@ class UserModelTestCase(TestCase):
     def test_is_following(self):
         """Does is_following successfully detect when user1 is following user2?"""
 
-        u1 = User(
-            email="user1@test.com",
-            username="user1",
-            password="HASHED_PASSWORD"
-        )
-        u2 = User(
-            email="user2@test.com",
-            username="user2",
-            password="HASHED_PASSWORD"
-        )
-    
-        # this is the ORM way of doing it
-        u1.following.append(u2)
+        # bulk insert skips the ORM's unit of work; giving the rows their
+        # ids up front lets each table go in as a single executemany
+        db.session.bulk_insert_mappings(User, [
+            {"id": 1001, "email": "user1@test.com", "username": "user1", "password": "HASHED_PASSWORD"},
+            {"id": 1002, "email": "user2@test.com", "username": "user2", "password": "HASHED_PASSWORD"},
+        ])
 
-        # this is the SQL way of doing it
         # add the follow in the Follows table
-        # f = Follows(user_being_followed_id=u2.id, user_following_id=u1.id)
-        # db.session.add(f)
-
-        db.session.add_all([u1, u2])
+        db.session.bulk_insert_mappings(Follows, [
+            {"user_being_followed_id": 1002, "user_following_id": 1001},
+        ])
         db.session.commit()
 
+        u1 = User.query.get(1001)
+        u2 = User.query.get(1002)
+
         self.assertEqual(u1.is_following(u2), True)
         self.assertEqual(u2.is_following(u1), False)
 
     def test_is_followed_by(self):
         """Does is_followed_by successfully detect when user1 is followed by user2?"""
 
-        u1 = User(
-            email="user1@test.com",
-            username="user1",
-            password="HASHED_PASSWORD"
-        )
-        u2 = User(
-            email="user2@test.com",
-            username="user2",
-            password="HASHED_PASSWORD"
-        )
-
-        u1.followers.append(u2)
+        db.session.bulk_insert_mappings(User, [
+            {"id": 1001, "email": "user1@test.com", "username": "user1", "password": "HASHED_PASSWORD"},
+            {"id": 1002, "email": "user2@test.com", "username": "user2", "password": "HASHED_PASSWORD"},
+        ])
 
-        db.session.add_all([u1, u2])
+        db.session.bulk_insert_mappings(Follows, [
+            {"user_being_followed_id": 1001, "user_following_id": 1002},
+        ])
         db.session.commit()
 
+        u1 = User.query.get(1001)
+        u2 = User.query.get(1002)
+
         self.assertEqual(u1.is_followed_by(u2), True)
         self.assertEqual(u2.is_followed_by(u1), False)
 
+    def test_follow_checks_without_loading(self):
+        """Do is_following/is_followed_by ask the database when the follows aren't loaded?"""
+
+        u1 = User(email="user1@test.com", username="user1", password="HASHED_PASSWORD")
+        u2 = User(email="user2@test.com", username="user2", password="HASHED_PASSWORD")
+        u1.following.append(u2)
+        db.session.add_all([u1, u2])
+        db.session.commit()
+
+        # the commit expired both users, so neither collection is loaded
+        self.assertIn('following', inspect(u1).unloaded)
+        self.assertIn('followers', inspect(u2).unloaded)
+
+        self.assertEqual(u1.is_following(u2), True)
+        self.assertEqual(u2.is_following(u1), False)
+        self.assertEqual(u2.is_followed_by(u1), True)
+        self.assertEqual(u1.is_followed_by(u2), False)
+
+        # answered with EXISTS queries, not by loading the collections
+        self.assertIn('following', inspect(u1).unloaded)
+        self.assertIn('followers', inspect(u2).unloaded)
+
+        # and the in-memory path agrees once they are loaded
+        self.assertEqual(u2 in u1.following, True)
+        self.assertEqual(u1.is_following(u2), True)
+        self.assertEqual(u2.is_followed_by(u1), True)
+
     def test_signup(self):
         """Does User.signup successfully create a new user given valid credentials?"""
 
@@ -139,7 +134,7 @@ class UserModelTestCase(TestCase):
 
         db.session.commit()
 
-        self.assertEqual(u, db.session.query(User).get(u.id))
+        self.assertEqual(u, User.query.get(u.id))
 
     def test_signup_repeated_fail(self):
         """Does User.signup fail to create a new user if any of the validations (e.g. uniqueness, non-nullable fields) fail?"""
@@ -183,6 +178,33 @@ class UserModelTestCase(TestCase):
 
         self.assertRaises(Exception, db.session.commit)
 
+    def test_write_after_rollback_rolled_back(self):
+        """Is what a test writes after rolling back still undone when the test ends?"""
+
+        User.signup(
+            username=None,
+            email="whatever",
+            password="real_password",
+            image_url=None
+        )
+
+        self.assertRaises(Exception, db.session.commit)
+        db.session.rollback()
+
+        User.signup(
+            username="testuser",
+            email="test@test.com",
+            password="real_password",
+            image_url=None
+        )
+        db.session.commit()
+
+        # finish this test and start the next, as the test runner would
+        self.tearDown()
+        self.setUp()
+
+        self.assertEqual(User.query.count(), 0)
+
     def test_authenticate(self):
         """Does User.authenticate successfully return a user when given a valid username and password?"""
 
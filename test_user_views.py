@@ -5,56 +5,38 @@
 #    FLASK_ENV=production python -m unittest test_message_views.py
 
 
-import os
-from unittest import TestCase
+from models import db, Message, User
+from tests.base import BaseTestCase
 
-from models import db, connect_db, Message, User
 
-# BEFORE we import our app, let's set an environmental variable
-# to use a different database for tests (we need to do this
-# before we import our app, since that will have already
-# connected to the database
-
-os.environ['DATABASE_URL'] = "postgresql:///warbler-test"
-
-
-# Now we can import app
-
-from app import app, CURR_USER_KEY
-
-# Create our tables (we do this here, so we only create the tables
-# once for all tests --- in each test, we'll delete the data
-# and create fresh new clean test data
-
-db.create_all()
+class UserViewTestCase(BaseTestCase):
+    """Test views for messages."""
 
-# Don't have WTForms use CSRF at all, since it's a pain to test
+    @classmethod
+    def setUpClass(cls):
+        """Add sample data shared by every test."""
 
-app.config['WTF_CSRF_ENABLED'] = False
+        super().setUpClass()
 
+        testuser = User.signup(username="testuser",
+                               email="test@test.com",
+                               password="testuser",
+                               image_url=None)
 
-class UserViewTestCase(TestCase):
-    """Test views for messages."""
+        db.session.commit()
+        cls.testuser_id = testuser.id
+        db.session.close()
 
     def setUp(self):
-        """Create test client, add sample data."""
-
-        User.query.delete()
-        Message.query.delete()
+        """Load sample data."""
 
-        self.client = app.test_client()
+        super().setUp()
 
-        self.testuser = User.signup(username="testuser",
-                                    email="test@test.com",
-                                    password="testuser",
-                                    image_url=None)
-
-        db.session.commit()
+        self.testuser = User.query.get(self.testuser_id)
 
     def login(self):
         """Log in user."""
-        with self.client.session_transaction() as session:
-            session[CURR_USER_KEY] = self.testuser.id
+        self.login_as(self.testuser.id)
 
     def test_add_message(self):
         """Can use add a message?"""
@@ -74,7 +56,7 @@ class UserViewTestCase(TestCase):
         with self.client as c:
             resp = c.post("/messages/new", data={"text": "Hello"}, follow_redirects=True)
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
     def test_delete_message(self):
         """Can use delete a message?"""
@@ -94,7 +76,7 @@ class UserViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
 
             # check the message was deleted
-            self.assertIsNone(db.session.query(Message).get(msg.id))
+            self.assertIsNone(Message.query.get(msg.id))
 
     def test_delete_message_no_authentication(self):
         """Can use delete a message without authentication?"""
@@ -110,10 +92,10 @@ class UserViewTestCase(TestCase):
 
             resp = c.post(f"/messages/{msg.id}/delete", follow_redirects=True)
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
             # check the message was not deleted
-            self.assertIsNotNone(db.session.query(Message).get(msg.id))
+            self.assertIsNotNone(Message.query.get(msg.id))
 
     def test_list_users(self):
         """Can we view the list of users?"""
@@ -121,7 +103,7 @@ class UserViewTestCase(TestCase):
         with self.client as c:
             resp = c.get("/users")
 
-            self.assertIn("@testuser", str(resp.data))
+            self.assertIn(b"@testuser", resp.data)
 
     def test_user_show(self):
         """Can we view a user?"""
@@ -129,7 +111,7 @@ class UserViewTestCase(TestCase):
         with self.client as c:
             resp = c.get(f"/users/{self.testuser.id}")
 
-            self.assertIn("@testuser", str(resp.data))
+            self.assertIn(b"@testuser", resp.data)
 
     def test_user_following(self):
         """Can we view a user's following page?"""
@@ -139,7 +121,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/following")
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("@testuser", str(resp.data))
+            self.assertIn(b"@testuser", resp.data)
 
     def test_user_following_no_authentication(self):
         """Can we view a user's following page without authentication?"""
@@ -148,7 +130,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/following", follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
     def test_user_followers(self):
         """Can we view a user's followers page?"""
@@ -158,7 +140,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/followers")
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("@testuser", str(resp.data))
+            self.assertIn(b"@testuser", resp.data)
 
     def test_user_followers_no_authentication(self):
         """Can we view a user's followers page without authentication?"""
@@ -167,7 +149,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/followers", follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
     def test_user_likes(self):
         """Can we view a user's likes page?"""
@@ -177,7 +159,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/likes")
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("@testuser", str(resp.data))
+            self.assertIn(b"@testuser", resp.data)
 
     def test_user_likes_no_authentication(self):
         """Can we view a user's likes page without authentication?"""
@@ -186,7 +168,7 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/{self.testuser.id}/likes", follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
     def test_add_follow(self):
         """Can we add a follow?"""
@@ -202,7 +184,6 @@ class UserViewTestCase(TestCase):
             db.session.add(u)
             db.session.commit()
 
-            self.testuser = db.session.query(User).get(self.testuser.id)
             self.assertEqual(len(self.testuser.following), 0)
 
 
@@ -210,7 +191,7 @@ class UserViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
 
             # retrieve the updated user from the db
-            self.testuser = db.session.query(User).get(self.testuser.id)
+            self.testuser = User.query.get(self.testuser_id)
             self.assertEqual(len(self.testuser.following), 1)
 
     def test_add_follow_no_authentication(self):
@@ -227,7 +208,7 @@ class UserViewTestCase(TestCase):
 
             resp = c.post(f"/users/follow/{u.id}", follow_redirects=True)
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
             
     def test_stop_following(self):
         """Can we stop following?"""
@@ -239,12 +220,8 @@ class UserViewTestCase(TestCase):
                 username="user2",
                 password="HASHED_PASSWORD"
             )
-            db.session.add(u)
-            db.session.commit()
 
-            self.testuser = db.session.query(User).get(self.testuser.id)
             self.testuser.following.append(u)
-            db.session.add(self.testuser)
             db.session.commit()
 
 
@@ -252,7 +229,7 @@ class UserViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
 
             # retrieve the updated user from the db
-            self.testuser = db.session.query(User).get(self.testuser.id)
+            self.testuser = User.query.get(self.testuser_id)
             self.assertEqual(len(self.testuser.following), 0)
 
     def test_stop_following_no_authentication(self):
@@ -270,22 +247,25 @@ class UserViewTestCase(TestCase):
             resp = c.post(f"/users/stop-following/{u.id}", follow_redirects=True)
             self.assertEqual(resp.status_code, 200)
 
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
-    def test_user_edit(self):
-        """Can we edit our profile?"""
+    def test_user_edit_form_renders(self):
+        """Can we view the edit profile form?"""
 
         with self.client as c:
-            with c.session_transaction() as sess:
-                sess[CURR_USER_KEY] = self.testuser.id
+            self.login()
 
-            # GET REQUEST
             resp = c.get(f"/users/profile")
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn('<h2 class="join-message">Edit Your Profile.</h2>', str(resp.data))
+            self.assertIn(b'<h2 class="join-message">Edit Your Profile.</h2>', resp.data)
+
+    def test_user_edit(self):
+        """Can we edit our profile?"""
+
+        with self.client as c:
+            self.login()
 
-            # POST REQUEST
             resp = c.post(f"/users/profile", data={
                 "username": "testuser2",
                 "email": "edited_email@ex.com",
@@ -298,7 +278,7 @@ class UserViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
             
             # check the user was updated
-            self.testuser = db.session.query(User).get(self.testuser.id)
+            self.testuser = User.query.get(self.testuser_id)
 
             self.assertEqual(self.testuser.username, "testuser2")
             self.assertEqual(self.testuser.email, "edited_email@ex.com")
@@ -312,13 +292,13 @@ class UserViewTestCase(TestCase):
             resp = c.get(f"/users/profile", follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))           
+            self.assertIn(b"Access unauthorized", resp.data)           
 
             # POST REQUEST
             resp = c.post(f"/users/profile", data={}, follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
+            self.assertIn(b"Access unauthorized", resp.data)
 
     def test_user_delete(self):
         """Can we delete our profile?"""
@@ -331,7 +311,7 @@ class UserViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
 
             # check the user was deleted
-            self.assertIsNone(db.session.query(User).get(self.testuser.id))
+            self.assertIsNone(User.query.get(self.testuser_id))
 
     def test_user_delete_no_authentication(self):
         """Can we delete our profile without authentication?"""
@@ -341,4 +321,22 @@ class UserViewTestCase(TestCase):
             resp = c.post(f"/users/delete", follow_redirects=True)
 
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("Access unauthorized", str(resp.data))
\ No newline at end of file
+            self.assertIn(b"Access unauthorized", resp.data)
+    def test_fixture_user_survives_rollback(self):
+        """Is testuser left as it was by a test that rolls back and keeps writing?"""
+
+        # email clashes with testuser's
+        db.session.add(User(email="test@test.com", username="user2", password="HASHED_PASSWORD"))
+        self.assertRaises(Exception, db.session.commit)
+        db.session.rollback()
+
+        self.testuser = User.query.get(self.testuser_id)
+        self.testuser.username = "testuser2"
+        db.session.commit()
+
+        # finish this test and start the next, as the test runner would
+        self.tearDown()
+        self.setUp()
+
+        self.assertEqual(self.testuser.username, "testuser")
+        self.assertEqual(User.query.count(), 1)
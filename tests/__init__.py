@@ -0,0 +1 @@
+"""Shared helpers for the Warbler test suite."""
@@ -0,0 +1,61 @@
+"""Shared setup for the Warbler view tests.
+
+Every view test module imports from here, so the app is configured and
+the test database is set up once per process, however many test modules
+get loaded.
+"""
+
+from functools import lru_cache
+
+from tests.database import DatabaseTestCase, configure_test_app
+
+# Now we can import app (tests.database has already pointed
+# DATABASE_URL at the test database)
+
+from app import app, CURR_USER_KEY
+
+configure_test_app(app)
+
+# Don't have WTForms use CSRF at all, since it's a pain to test, and
+# don't have Jinja check template files for changes on every render
+
+app.config.update(
+    TESTING=True,
+    DEBUG=False,
+    TEMPLATES_AUTO_RELOAD=False,
+    WTF_CSRF_ENABLED=False,
+)
+
+
+@lru_cache(maxsize=None)
+def session_cookie(user_id):
+    """Return a signed session cookie value that logs `user_id` in.
+
+    Signing it once per user is much cheaper than building the session
+    through `session_transaction()` in every test.
+    """
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    return serializer.dumps({CURR_USER_KEY: user_id})
+
+
+class BaseTestCase(DatabaseTestCase):
+    """Base class for tests that drive the full Flask app.
+
+    Each request pushes its own app context and removes the session when
+    it ends, as in production, so objects a test loaded before a request
+    are detached afterwards: query them again to see what it changed.
+    """
+
+    def setUp(self):
+        """Create test client."""
+
+        super().setUp()
+
+        self.client = app.test_client()
+
+    def login_as(self, user_id):
+        """Log the test client in as `user_id`."""
+
+        self.client.set_cookie(
+            'localhost', app.session_cookie_name, session_cookie(user_id))
@@ -0,0 +1,227 @@
+"""Database-only test layer for the Warbler tests.
+
+Model tests only need `db`, so they build on `DatabaseTestCase` here and
+never import the Flask app itself (see `tests.base` for view tests).
+"""
+
+import os
+from unittest import TestCase
+
+from flask import Flask
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine.url import make_url
+
+
+def _worker_db_url(url):
+    """Give each pytest-xdist worker its own copy of the test database.
+
+    E.g. `postgresql:///warbler-test` becomes `postgresql:///warbler-test-gw0`
+    on worker gw0. Outside xdist, or for in-memory SQLite, `url` is
+    returned as is.
+    """
+
+    worker = os.environ.get('PYTEST_XDIST_WORKER')
+    url = make_url(url)
+
+    if worker and url.database not in (None, '', ':memory:'):
+        url.database = f"{url.database}-{worker}"
+
+    return str(url)
+
+
+# BEFORE we import our app, let's set an environmental variable
+# to use a different database for tests (we need to do this
+# before we import our app, since that will have already
+# connected to the database
+#
+# Set TEST_DB_URL to use some other database, e.g. `sqlite://` for an
+# in-memory SQLite one. Tests that need Postgres itself can instead
+# point it at a throwaway cluster on tmpfs with durability switched
+# off, so commits never wait on fsync:
+#
+#    initdb -D /dev/shm/warbler-pg
+#    pg_ctl -D /dev/shm/warbler-pg start \
+#        -o "-F -c synchronous_commit=off -c full_page_writes=off"
+#    createdb warbler-test
+#
+# Under pytest-xdist every worker gets its own database (created on first
+# use), so workers never see each other's rows.
+
+os.environ['DATABASE_URL'] = _worker_db_url(os.environ.get(
+    'TEST_DB_URL', "postgresql:///warbler-test"))
+
+from models import db, bcrypt
+
+# The cheapest cost bcrypt allows: hashing with the production cost
+# would otherwise dominate every test that signs a user up
+
+TEST_BCRYPT_LOG_ROUNDS = 4
+
+_initialized = False
+
+# The SAVEPOINTs `DatabaseTestCase` has open on `connection`, innermost last
+
+_savepoints = []
+
+
+def _is_sqlite():
+    """Are the tests running against SQLite?"""
+
+    return os.environ['DATABASE_URL'].startswith('sqlite')
+
+
+def _enable_sqlite_savepoints(engine):
+    """Let SAVEPOINTs work on pysqlite.
+
+    pysqlite starts and ends transactions behind SQLAlchemy's back, which
+    breaks SAVEPOINTs, so take it out of the loop and emit BEGIN ourselves.
+    Also turn on foreign keys so `ondelete` behaves as it does on Postgres.
+    """
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        conn.execute("BEGIN")
+
+
+def _create_postgres_db_if_missing(url):
+    """Create the Postgres database named in `url` unless it already exists."""
+
+    url = make_url(url)
+    name = url.database
+    url.database = 'postgres'
+
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+
+    try:
+        exists = engine.execute(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            name=name,
+        ).scalar()
+
+        if not exists:
+            engine.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        engine.dispose()
+
+
+def _restart_savepoint(session, transaction):
+    """Reopen the innermost SAVEPOINT if the session just rolled it back.
+
+    The session joins `connection` inside that SAVEPOINT, so its own
+    transaction is only a marker there, and rolling it back (as a failed
+    commit does) rolls back the SAVEPOINT itself. Without a new one,
+    whatever the test wrote next would land outside it and outlive the
+    test.
+    """
+
+    if _savepoints and not _savepoints[-1].is_active:
+        _savepoints[-1] = connection.begin_nested()
+
+
+def configure_test_app(app):
+    """Apply the settings every app under test shares.
+
+    Must run before anything touches `db.engine` for `app`.
+    """
+
+    app.config['BCRYPT_LOG_ROUNDS'] = TEST_BCRYPT_LOG_ROUNDS
+
+    # The suite holds a single connection for its whole run (see
+    # `init_test_db`), so keep the pool small and never grow past it
+    # (SQLite gets its own pool from Flask-SQLAlchemy)
+
+    if not _is_sqlite():
+        app.config['SQLALCHEMY_POOL_SIZE'] = 5
+        app.config['SQLALCHEMY_MAX_OVERFLOW'] = 0
+
+    bcrypt.init_app(app)
+
+
+def create_db_app():
+    """Return a bare Flask app (no views, templates or forms) for `db`."""
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    configure_test_app(app)
+
+    return app
+
+
+def init_test_db():
+    """Create any missing tables and join the session to a never-committed transaction.
+
+    Every test then runs inside a SAVEPOINT on that transaction (see
+    `DatabaseTestCase`), so nothing a test writes ever hits disk. Needs
+    an app to be registered on `db`; only the first call does anything.
+    """
+
+    global _initialized, connection, transaction
+
+    if _initialized:
+        return
+
+    if _is_sqlite():
+        _enable_sqlite_savepoints(db.engine)
+    elif os.environ.get('PYTEST_XDIST_WORKER'):
+        _create_postgres_db_if_missing(os.environ['DATABASE_URL'])
+
+    # One query listing the tables is enough to tell whether an earlier
+    # run already created them; create_all() would check each in turn
+
+    if not set(db.metadata.tables) <= set(inspect(db.engine).get_table_names()):
+        db.create_all()
+
+    connection = db.engine.connect()
+    transaction = connection.begin()
+
+    db.session.remove()
+    db.session.configure(bind=connection, binds={})
+    event.listen(db.session, 'after_transaction_end', _restart_savepoint)
+
+    _initialized = True
+
+
+class DatabaseTestCase(TestCase):
+    """Runs each test in a SAVEPOINT that gets rolled back afterwards.
+
+    Each class also gets its own outer SAVEPOINT, so rows a subclass
+    creates in `setUpClass` are shared by all of its tests (whatever a
+    test changes is still rolled back) and go away after the last one.
+    Either SAVEPOINT is reopened if a session rollback ends it early.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Make sure the test database is ready and open the class SAVEPOINT."""
+
+        super().setUpClass()
+        init_test_db()
+
+        _savepoints.append(connection.begin_nested())
+
+    @classmethod
+    def tearDownClass(cls):
+        """Roll back the class's fixture data."""
+
+        db.session.close()
+        _savepoints.pop().rollback()
+
+        super().tearDownClass()
+
+    def setUp(self):
+        """Open this test's SAVEPOINT."""
+
+        _savepoints.append(connection.begin_nested())
+
+    def tearDown(self):
+        """Roll back everything the test did."""
+
+        db.session.close()
+        _savepoints.pop().rollback()